@@ -81,9 +81,9 @@ def run(*cohorts, **kwargs):
     distinct = enrichment.distinct_pathways(enriched_unshared)
 
     # Display a sample module.
-    cancer = inputs.keys()[0]
+    cancer = next(iter(inputs))
     # The enriched module numbers.
-    module_numbers = enriched[cancer].index.get_values()
+    module_numbers = enriched[cancer].index.values
     print("Enriched %s module numbers:" % cancer)
     print(module_numbers)
     # Show the enriched pathways for the sample module.
@@ -180,7 +180,7 @@ def _prepare(cohort, maf_dir, min_sample_count, min_sample_proportion,
     if max_module_count < cluster.index.size:
         cluster = cluster[:max_module_count]
     # Restrict by module size.
-    return cluster[cluster.apply(len).ge(min_module_size)]
+    return cluster[cluster.str.len().ge(min_module_size)]
 
 
 if __name__ == "__main__":
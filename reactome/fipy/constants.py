@@ -10,3 +10,12 @@ DEF_MIN_SAMPLE_COUNT = 2
 
 SERVICE_URL = 'http://localhost:1234'
 """The REST service url."""
+
+MAX_REQUEST_WORKERS = 1
+"""
+The maximum number of concurrent REST request threads. The server
+retains the most recently enriched genes and is not known to handle
+concurrent enrichment requests, so the default issues one request at
+a time. Concurrency is opt-in: raise it, or pass the enrich *workers*
+option, to overlap the request round trips.
+"""
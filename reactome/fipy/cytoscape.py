@@ -1,12 +1,47 @@
 import requests
 from . import rest
 
+highlighted = None
+"""
+The gene frozenset most recently enriched in the Cytoscape session,
+or None if unknown. The session highlights diagrams with that gene set.
+"""
+
+_reset_callbacks = []
+"""The callables which discard the client state derived from the session."""
+
+
+def on_reset(callback):
+    """
+    Registers a callable which discards client state derived from
+    the Cytoscape session. The callable is called without arguments
+    by :meth:`reset`.
+
+    :param callback: the callable to register
+    """
+    _reset_callbacks.append(callback)
+
+
+def reset():
+    """
+    Discards the client state derived from the Cytoscape session,
+    i.e. the :const:`highlighted` genes and the :meth:`on_reset`
+    registered state.
+    """
+    global highlighted
+    highlighted = None
+    for callback in _reset_callbacks:
+        callback()
+
+
 def clear():
     """
     Clears the current Cytoscape session, if any.
     """
+    # The cleared session no longer retains the derived state.
+    reset()
     try:
-        requests.delete(rest.get_url('session')).ok
+        rest.SESSION.delete(rest.get_url('session')).ok
     except requests.exceptions.ConnectionError:
         print("Error: Connection refused: is Cytoscape started?")
         raise
@@ -1,12 +1,16 @@
 # 2.x compatibility to print to stderr with a function.
 from __future__ import print_function
 from functools import reduce
+from itertools import (chain, islice)
 import sys
 import os
 import re
 import logging
-import requests
-from . import rest
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from .constants import MAX_REQUEST_WORKERS
+from . import (cytoscape, reactome, rest)
 
 
 PARSERS = {
@@ -19,7 +23,19 @@ PARSERS = {
     'HitGenes': lambda s: s.split(',')
 }
 
-def enrich(*clusters):
+WORD_SEPARATOR = re.compile(r'[^\w]+')
+"""The pathway name word separator."""
+
+_ENRICHMENT_CACHE = {}
+"""
+The {gene frozenset: enrichment data frame} cache. The cache is
+cleared when the Cytoscape session state is reset.
+"""
+
+cytoscape.on_reset(_ENRICHMENT_CACHE.clear)
+
+
+def enrich(*clusters, workers=None):
     """
     Perform pathway enrichment analysis on the given clusters.
     The resulting data frame(s) have index *Pathway* and columns
@@ -31,10 +47,29 @@ def enrich(*clusters):
     clusters. If an input cluster could not be enriched, then
     the result for that cluster is `None`.
 
+    The enrichment requests are issued one module at a time by
+    default. Concurrent requests are opt-in: if *workers* is greater
+    than one, then the requests for all modules of all clusters are
+    issued concurrently by that many threads.
+
     :param clusters: the cluster series to enrich
+    :option workers: the maximum number of concurrent requests
+        (default :const:`reactome.fipy.constants.MAX_REQUEST_WORKERS`)
     :return: the result data frame(s)
     """
-    enrichments = [cluster.apply(_enrich_genes) for cluster in clusters]
+    if not workers:
+        workers = MAX_REQUEST_WORKERS
+    # The gene sets of all clusters, in cluster order.
+    genesets = chain.from_iterable(cluster.values for cluster in clusters)
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(_enrich_genes, genesets)
+    else:
+        results = map(_enrich_genes, genesets)
+    # Regroup the results by cluster.
+    enrichments = [pd.Series(list(islice(results, cluster.size)),
+                             index=cluster.index, name=cluster.name)
+                   for cluster in clusters]
     return enrichments[0] if len(enrichments) == 1 else enrichments
 
 
@@ -46,9 +81,15 @@ def shared_pathways(enrichments):
     :param enrichments: the enriched series list
     :return: the common pathways
     """
-    intersect = lambda s1, s2: s1.intersection(s2)
     pathways = [_collect_pathways(enriched) for enriched in enrichments]
-    return reduce(intersect, pathways)
+    # Intersect the smallest pathway collections first.
+    pathways.sort(key=len)
+    shared = pathways[0]
+    for other in pathways[1:]:
+        if shared.empty:
+            break
+        shared = shared.intersection(other)
+    return shared
 
 
 def transpose_pathways(*enrichments, exclude=None):
@@ -95,14 +136,20 @@ def distinct(series_list):
     Restricts each of the given series to those index
     values that do not occur in the other series in the
     list. Each series must be indexed solely by pathways.
+    Each restriction is sorted by pathway.
 
     :param series_list: the list of pathway-indexed series
     :return: the distinct restrictions
     """
-    indexes = [s.index for s in series_list]
-    criteria = [_distinct_index(i, indexes)
-                for i in range(len(indexes))]
-    return [s[criteria[i]] for i, s in enumerate(series_list)]
+    if not series_list:
+        return []
+    # Count the series in which each pathway occurs.
+    pathways = pd.concat([s.index.unique().to_series() for s in series_list])
+    counts = pathways.value_counts()
+    # The pathways which occur in only one series.
+    unique_pathways = counts.index[counts.eq(1)]
+    return [s[s.index.isin(unique_pathways)].sort_index()
+            for s in series_list]
 
 
 def exportable(pathways, hierarchy):
@@ -113,11 +160,12 @@ def exportable(pathways, hierarchy):
     :param hierarchy: the Reactome pathway hierarchy
     :yield: the (pathway, database id) tuple
     """
-    for pathway in pathways:
-        node = _get_hierarchy_node(pathway, hierarchy)
-        if node and node['hasDiagram']:
-            db_id = node['dbId']
-            yield (pathway, db_id)
+    nodes = reactome.index_hierarchy(hierarchy)
+    # Look up the pathways in one pass.
+    found = nodes.reindex(list(pathways))
+    selected = found[found.hasDiagram.eq(True)]
+    for pathway, db_id in zip(selected.index, selected.dbId):
+        yield (pathway, int(db_id))
 
 
 def export_diagram(pathway, db_id, genes, out_dir=None):
@@ -134,17 +182,19 @@ def export_diagram(pathway, db_id, genes, out_dir=None):
     :return: the exported PDF file name
     """
     # Re-enrich the genes in order to get the proper diagram
-    # highlighting.
-    _enrich_genes(genes)
+    # highlighting, unless the session already has these genes.
+    key = frozenset(genes)
+    if key != cytoscape.highlighted:
+        _ENRICHMENT_CACHE[key] = _request_enrichment(genes)
+        cytoscape.highlighted = key
     if not out_dir:
         out_dir = os.getcwd()
-    separator = re.compile('[^\w]+')
     capitalized = [word[0].upper() + word[1:]
-                   for word in separator.split(pathway) if word]
+                   for word in WORD_SEPARATOR.split(pathway) if word]
     base_name = ''.join(capitalized)
     file_name = os.path.join(out_dir, "%s.pdf" % base_name)
     body = dict(dbId=db_id, pathwayName=pathway, fileName=file_name)
-    requests.post(rest.get_fi_url('exportPathwayDiagram'), json=body)
+    rest.SESSION.post(rest.get_fi_url('exportPathwayDiagram'), json=body)
     logging.info("Exported pathway '%s' to %s." % (pathway, file_name))
     return file_name
 
@@ -153,16 +203,36 @@ def _enrich_genes(genes):
     """
     Perform pathway enrichment analysis on the given gene
     list or set. The resulting data frame has index *Pathway*
-    and columns *p-value* and *FDR*
+    and columns *p-value* and *FDR*. The result is cached by
+    gene set, so a gene set is enriched at most once. The caller
+    receives a copy, so modifying the result leaves the cache intact.
 
     :param genes: the gene list or set to enrich
     :return: the result data frame, or an empty data frame
       if the genes could not be enriched
     """
+    key = frozenset(genes)
+    enriched = _ENRICHMENT_CACHE.get(key)
+    if enriched is None:
+        enriched = _ENRICHMENT_CACHE[key] = _request_enrichment(genes)
+    return enriched.copy()
+
+
+def _request_enrichment(genes):
+    """
+    Requests the server pathway enrichment analysis of the given
+    genes. The server retains the genes for diagram highlighting.
+
+    :param genes: the gene list or set to enrich
+    :return: the :meth:`_enrich_genes` result data frame
+    """
+    # The session enrichment state is unknown while requests
+    # might be in flight.
+    cytoscape.highlighted = None
     data = ','.join(genes)
     # Perform the Reactome enrichment analysis.
-    resp = requests.post(rest.get_fi_url('ReactomePathwayEnrichment'),
-                         data=data)
+    resp = rest.SESSION.post(rest.get_fi_url('ReactomePathwayEnrichment'),
+                             data=data)
     if not resp.ok:
         print("Enrichment unsuccessful: was the Reactome hierarchy loaded?",
               file=sys.stderr)
@@ -176,31 +246,6 @@ def _enrich_genes(genes):
     return parsed.loc[:, ['p-value', 'FDR']]
 
 
-def _get_hierarchy_node(pathway, hierarchy):
-    """
-    Returns the Reactome hierarchy node for the given pathway.
-
-    :param pathway: the pathway to check
-    :param hierarchy: the Reactome pathway hierarchy to check
-    :return: the hierarchy node
-    """
-    if hierarchy['name'] == pathway:
-        return hierarchy
-    children = hierarchy.get('children')
-    if children:
-        for subtree in children:
-            target = _get_hierarchy_node(pathway, subtree)
-            if target:
-                return target
-
-
-def _distinct_index(i, indexes):
-    copied = indexes.copy()
-    target = copied.pop(i)
-    diff = lambda idx1, idx2: idx1.difference(idx2)
-    return reduce(diff, copied, target)
-
-
 def _flatten_transposed_series(column, transposed):
     """
     Converts the given {pathway: {module: results}} series
@@ -211,10 +256,13 @@ def _flatten_transposed_series(column, transposed):
     :param transposed: the transposed series
     :return: the flattend series
     """
-    grouper = transposed[column].groupby(level='Pathway')
-    # Pull the module number from the (pathway, module)
-    # maximum index value.
-    return grouper.idxmax().apply(lambda idx: idx[1])
+    # Group the column values by pathway, keyed by row position.
+    values = transposed[column].reset_index(drop=True)
+    pathways = transposed.index.get_level_values('Pathway')
+    positions = values.groupby(pathways).idxmax()
+    # Pull the module numbers at the maximum value positions.
+    modules = transposed.index.get_level_values('Module')[positions.values]
+    return pd.Series(modules, index=positions.index, name=column)
 
 
 def _transpose_enrichment_pathways(enrichment, exclude=None):
@@ -226,13 +274,13 @@ def _transpose_enrichment_pathways(enrichment, exclude=None):
     :param exclude: pathways to exclude
     :return: the data frame(s) with pathway index
     """
-    # The ith module number.
-    module = lambda i: enrichment.index.values[i]
+    # The module numbers.
+    modules = enrichment.index.values
     # Inject the module number into each enhanced series.
-    dfs = [_add_module_index(df, module(i))
+    dfs = [_add_module_index(df, modules[i])
            for i, df in enumerate(enrichment)]
     # Accumulate the multi-indexed enrichments.
-    combined = dfs[0].append(dfs[1:])
+    combined = pd.concat(dfs)
     if exclude:
         return _exclude_transposed_pathways(combined, exclude)
     else:
@@ -253,7 +301,13 @@ def _add_module_index(enriched, module):
     :param module: the module number
     :return: the data frame with (pathway, module) multi-index
     """
-    return enriched.assign(Module=module).set_index([enriched.index, 'Module'])
+    modules = np.full(len(enriched), module)
+    index = pd.MultiIndex.from_arrays([enriched.index, modules],
+                                      names=[enriched.index.name, 'Module'])
+    # Relabel a shallow copy rather than copying the data.
+    indexed = enriched.copy(deep=False)
+    indexed.index = index
+    return indexed
 
 
 def _collect_pathways(enrichment):
@@ -261,7 +315,5 @@ def _collect_pathways(enrichment):
     :param enrichment: the enriched series
     :return: the union of pathways in the series
     """
-    pathways = set()
-    for df in enrichment.values:
-        pathways.update(df.index.get_values())
-    return pathways
+    indexes = [df.index for df in enrichment.values]
+    return reduce(lambda idx1, idx2: idx1.union(idx2), indexes, pd.Index([]))
@@ -1,5 +1,23 @@
 import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import requests
+from . import rest
+
+CHUNK_SIZE = 64 * 1024
+"""The download streaming chunk byte size."""
+
+PAGE_WINDOW = 8
+"""The number of MAF pages requested concurrently."""
+
+SPOOL_SIZE = 4 * 1024 * 1024
+"""
+The page byte size above which a downloaded page is spooled to a
+temporary file rather than held in memory.
+"""
 
 
 def download(cohort, out_file=None):
@@ -8,6 +26,10 @@ def download(cohort, out_file=None):
     The default output file is `<cohort>.maf` in the
     sandbox directory.
 
+    Up to :const:`PAGE_WINDOW` MAF pages are requested at a time
+    and written to the output file in page order. The requests
+    past the end of the MAF are cancelled.
+
     *Note*: As of April 2018, the Firebrowse server is unstable.
     Calling this method is not recommended until the server
     stabilizes.
@@ -24,24 +46,85 @@ def download(cohort, out_file=None):
     url = 'http://firebrowse.org/api/v1/Analyses/Mutation/MAF'
     print("Downloading the %s MAF file to %s..." % (cohort, maf_file))
     params = dict(format='tsv', cohort=cohort, page_size=200)
-    eof = False
-    page = 1
-    with open(maf_file, 'w') as f:
-        while not eof:
-            params['page'] = page
-            resp = requests.get(url, params=params)
-            if not resp.ok:
-                print("Error encountered downloading the %s MAF file. Please retry." %
-                      cohort)
-                resp.raise_for_status()
-            text = resp.text
-            if text:
-                f.write(text)
-                page = params['page'] = page + 1
-            else:
-                eof = True
-            print('+', end='')
+    fetch = partial(_download_page, url, params)
+    with open(maf_file, 'wb') as f:
+        with ThreadPoolExecutor(max_workers=PAGE_WINDOW) as executor:
+            # The in-flight page downloads, in page order.
+            pending = deque(executor.submit(fetch, page)
+                            for page in range(1, PAGE_WINDOW + 1))
+            page = PAGE_WINDOW + 1
+            try:
+                eof = False
+                while not eof:
+                    try:
+                        content = pending.popleft().result()
+                    except requests.exceptions.HTTPError:
+                        print("Error encountered downloading the %s MAF"
+                              " file. Please retry." % cohort)
+                        raise
+                    with content:
+                        # An empty page signals the end of the MAF.
+                        if content.tell():
+                            content.seek(0)
+                            shutil.copyfileobj(content, f)
+                        else:
+                            eof = True
+                    print('+', end='')
+                    if not eof:
+                        # Keep the window full.
+                        pending.append(executor.submit(fetch, page))
+                        page += 1
+            finally:
+                # Cancel the speculative downloads past the last
+                # consumed page. Their errors are not reported.
+                for future in pending:
+                    _discard(future)
     print('')
     print("MAF file downloaded.")
 
     return maf_file
+
+
+def _download_page(url, params, page):
+    """
+    Downloads the given MAF page.
+
+    :param url: the MAF download URL
+    :param params: the download request parameters
+    :param page: the page number
+    :return: the spooled page content file, positioned at the
+        end of the content
+    :raise requests.exceptions.HTTPError: if the download is
+        unsuccessful
+    """
+    page_params = dict(params, page=page)
+    # Stream the page content to the spool.
+    with rest.SESSION.get(url, params=page_params, stream=True) as resp:
+        resp.raise_for_status()
+        content = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        try:
+            for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+                content.write(chunk)
+        except Exception:
+            content.close()
+            raise
+    return content
+
+
+def _discard(future):
+    """
+    Cancels the given page download. If the download has already
+    started, then its page content is closed when it completes.
+
+    :param future: the page download future
+    """
+    if not future.cancel():
+        future.add_done_callback(_close_page)
+
+
+def _close_page(future):
+    """
+    :param future: the completed page download future
+    """
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
@@ -1,7 +1,13 @@
 import os
 import logging
-import requests
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
+try:
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:
+    # pyarrow is optional.
+    pa_csv = None
 from .constants import DEF_MIN_SAMPLE_COUNT
 from . import (cytoscape, rest)
 
@@ -29,8 +35,16 @@ def prepare(*cohorts, **kwargs):
     :return: the cluster or list of clusters
     """
     in_dir = kwargs.pop('in_dir', os.getcwd())
-    clusters = [_prepare_cohort(cohort, in_dir, **kwargs)
-                for cohort in cohorts]
+    maf_files = [os.path.join(in_dir, "%s.maf" % cohort)
+                 for cohort in cohorts]
+    # Cytoscape clusters the currently displayed network, so the
+    # cohort networks are built and clustered one at a time. The
+    # MAF sample counts are read concurrently in the meantime.
+    with ThreadPoolExecutor() as executor:
+        sample_cnts = executor.map(_get_sample_count, maf_files)
+        clusters = [_prepare_cohort(cohort, maf_file, sample_cnt, **kwargs)
+                    for cohort, maf_file, sample_cnt
+                    in zip(cohorts, maf_files, sample_cnts)]
     return clusters[0] if len(clusters) == 1 else clusters
 
 
@@ -41,26 +55,28 @@ def limit_module_size(cluster, cutoff):
     :return: the cluster series whose modules are at least as
         large as the cut-off
     """
-    return cluster.loc[cluster.apply(len).ge(cutoff)]
+    return cluster.loc[cluster.str.len().ge(cutoff)]
 
 
-def _prepare_cohort(cohort, in_dir, **kwargs):
+def _prepare_cohort(cohort, maf_file, sample_count, **kwargs):
     """
     Utility function to build the network and cluster modules
     for the given cohort.
 
     :param cohort: the cancer type cohort name
+    :param maf_file: the cohort MAF file
+    :param sample_count: the number of MAF samples
     :param kwargs: the following options:
     :option min_sample_count: the absolute minimum number
         of samples
     :option min_sample_proportion: the minimum proportion of samples
     """
-    maf = os.path.join(in_dir, "%s.maf" % cohort)
-    build_network(maf, **kwargs)
+    build_network(maf_file, sample_count=sample_count, **kwargs)
     return cluster(name=cohort)
 
 
-def build_network(maf_file, min_sample_count=None, min_sample_proportion=None):
+def build_network(maf_file, min_sample_count=None, min_sample_proportion=None,
+                  sample_count=None):
     """
     Builds the network from the given MAF file. Only gene modules
     whose sample size exceeds a threshold are included. The
@@ -72,21 +88,26 @@ def build_network(maf_file, min_sample_count=None, min_sample_proportion=None):
     :option min_sample_count: the absolute minimum number
         of samples
     :option min_sample_proportion: the minimum proportion of samples
+    :option sample_count: the number of MAF samples, if already
+        known (default is to count the samples in the MAF file)
     """
     if not min_sample_count:
         min_sample_count = DEF_MIN_SAMPLE_COUNT
     if not min_sample_proportion:
         min_sample_proportion = 0
 
-    # Clear the current Cytoscape session, if any.
-    cytoscape.clear()
-    # Count the samples.
-    sample_cnt = _get_sample_count(maf_file)
-    # The proportional sample cut-off.
-    min_prop_sample_count = int(min_sample_proportion * sample_cnt)
+    if sample_count is None:
+        # Count the samples while the Cytoscape session is cleared.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            counter = executor.submit(_get_sample_count, maf_file)
+            cytoscape.clear()
+            sample_count = counter.result()
+    else:
+        cytoscape.clear()
     # The sample cut-off is the larger of the absolute minimum
     # and the proportional minimum.
-    sample_cutoff = max(min_sample_count, min_prop_sample_count)
+    sample_cutoff = max(min_sample_count,
+                        int(min_sample_proportion * sample_count))
     # Build the network.
     _load_network(maf_file, sample_cutoff)
 
@@ -101,7 +122,7 @@ def cluster(name):
     """
     # Cluster the currently displayed network.
     logging.info("Clustering the %s FI network..." % name)
-    resp = requests.get(rest.get_fi_url('cluster'))
+    resp = rest.SESSION.get(rest.get_fi_url('cluster'))
     # Parse the response JSON into a data frame.
     parsed = rest.parse_fi_table_response(resp, parsers=PARSERS,
                                           index='Module')
@@ -110,19 +131,35 @@ def cluster(name):
     genesets.name = name
 
     # Sort by module size.
-    sizes = genesets.apply(len).sort_values(ascending=False)
+    sizes = genesets.str.len().sort_values(ascending=False)
     return genesets.reindex(sizes.index)
 
 
 def _get_sample_count(maf_file):
     """
+    The MAF is read with pyarrow, if it is available, and pandas
+    otherwise.
+
     :param: the input MAF file
     :return: the number of samples
     """
-    maf_df = pd.read_csv(maf_file, sep='\t',
-                         usecols=['Tumor_Sample_Barcode'])
-    # The number of samples.
-    sample_cnt = len({tsb for tsb in maf_df.Tumor_Sample_Barcode})
+    if pa_csv:
+        parse_opts = pa_csv.ParseOptions(delimiter='\t')
+        convert_opts = pa_csv.ConvertOptions(
+            include_columns=['Tumor_Sample_Barcode'],
+            strings_can_be_null=True
+        )
+        table = pa_csv.read_csv(maf_file, parse_options=parse_opts,
+                               convert_options=convert_opts)
+        barcodes = table.column('Tumor_Sample_Barcode')
+        # The number of samples.
+        sample_cnt = pc.count_distinct(barcodes).as_py()
+    else:
+        maf_df = pd.read_csv(maf_file, sep='\t',
+                             usecols=['Tumor_Sample_Barcode'],
+                             dtype={'Tumor_Sample_Barcode': 'category'})
+        # The number of samples.
+        sample_cnt = maf_df.Tumor_Sample_Barcode.nunique()
     logging.debug("Sample Count: %d" % sample_cnt)
 
     return sample_cnt
@@ -138,5 +175,5 @@ def _load_network(maf_file, sample_cutoff):
                     userLinkers=False, showUnLinked=False,
                     fetchFIAnnotations=True,
                     sampleCutoffValue=sample_cutoff)
-        requests.post(rest.get_fi_url('buildFISubNetwork'), json=body)
+        rest.SESSION.post(rest.get_fi_url('buildFISubNetwork'), json=body)
         logging.info("The FI network is loaded to Cytoscape.")
@@ -1,8 +1,10 @@
-from functools import reduce
+from functools import lru_cache
+from itertools import chain
+import numpy as np
 import pandas as pd
 import warnings
+from scipy.sparse import csr_matrix
 from scipy.stats import hypergeom
-from statsmodels.sandbox.stats.multicomp import multipletests
 from IPython.display import HTML
 from .constants import BACKGROUND_GENE_CNT
 
@@ -21,38 +23,43 @@ def analyse(clusters, n=None):
     """
     if not n:
         n = BACKGROUND_GENE_CNT
-    # Make the overlap multi-index.
+    # The pair-wise intersection sizes are the products of the
+    # module x gene membership matrices.
+    genes, memberships = _encode(clusters)
+    counts = memberships[0].dot(memberships[1].T).tocsr()
+    counts.eliminate_zeros()
+    counts.sort_indices()
+    # The (module, module) positions of the non-empty intersections.
+    rows, cols = counts.nonzero()
+    # Make the overlap multi-index from the non-empty pairs.
     index_names = [cluster.name for cluster in clusters]
-    index_values = [cluster.index.values for cluster in clusters]
-    multi_index = pd.MultiIndex.from_product(index_values,
-                                             names=index_names)
-    # Take the pair-wise intersections.
-    genesets = [[set(gs) for gs in cluster.values]
-                for cluster in clusters]
-    data = [gs1.intersection(gs2)
-            for gs1 in genesets[0]
-            for gs2 in genesets[1]]
-    intersections = pd.Series(data=data, index=multi_index)
-    # Omit the empty intersections.
-    filtered = intersections[intersections.apply(len).gt(0)]
-
-    # Combine the geneset series.
-    shared = filtered.to_frame(name='Shared')
-    renamed = [ds.rename_axis(ds.name) for ds in clusters]
-    join = lambda accum, ds: accum.join(ds)
-    combined = reduce(join, renamed, shared)
-
-    # Calculate the p-values.
-    pvalue = lambda row: _overlap_pvalue(n, *row.values)
-    pvalues = combined.apply(pvalue, axis=1)
+    index_values = [clusters[0].index.values[rows],
+                    clusters[1].index.values[cols]]
+    multi_index = pd.MultiIndex.from_arrays(index_values,
+                                            names=index_names)
+    # Take the non-empty pair-wise intersections. The element-wise
+    # product of the overlapping membership rows holds the shared
+    # genes of each pair.
+    products = memberships[0][rows].multiply(memberships[1][cols]).tocsr()
+    products.sort_indices()
+    shared_genes = genes[products.indices]
+    bounds = zip(products.indptr[:-1], products.indptr[1:])
+    shared = [set(shared_genes[start:end]) for start, end in bounds]
+
+    # Calculate the p-values from the overlap sizes and the
+    # overlapping module sizes.
+    module_sizes = [cluster.str.len().values for cluster in clusters]
+    pvalues = _overlap_pvalues(n, counts.data, module_sizes[0][rows],
+                               module_sizes[1][cols])
 
     # Correct the p-values for multiple comparison hypothesis
     # testing by applying the Benjamini–Hochberg FDR procedure.
-    _, fdrs, _, _ = multipletests(pvalues.values, method='fdr_bh')
+    fdrs = _bh_fdr(pvalues)
 
     # Assemble the data frame.
-    cols = {'p-value': pvalues, 'FDR': fdrs}
-    return shared.assign(**cols)
+    data = {'Shared': shared, 'p-value': pvalues, 'FDR': fdrs}
+    return pd.DataFrame(data, index=multi_index,
+                        columns=['Shared', 'p-value', 'FDR'])
 
 
 def limit_overlap(overlaps, column, cutoff):
@@ -92,8 +99,8 @@ def _difference(cluster, multi_index, level):
     :param level: the level number
     :return: the filtered cluster
     """
-    shared = multi_index.get_level_values(level).unique()
-    return cluster[cluster.index.difference(shared)]
+    shared = _index_level_values(multi_index, level)
+    return cluster[~cluster.index.isin(shared)]
 
 
 def _index_level_values(multi_index, level):
@@ -102,7 +109,9 @@ def _index_level_values(multi_index, level):
     :param level: the level number
     :return: the level values
     """
-    return multi_index.get_level_values(level).unique()
+    # The used level values are already unique, so there is no
+    # need to materialize and hash the level value of each row.
+    return multi_index.remove_unused_levels().levels[level]
 
 
 def print_overlap(overlaps, qualifier=None, format='html'):
@@ -118,13 +127,9 @@ def print_overlap(overlaps, qualifier=None, format='html'):
     """
     flat = overlaps.reset_index()
 
-    columns = [col for col in flat.columns if not col.endswith("Genes")]
-    cohort_col_grps = [[col for col in columns if col.startswith(name)]
-                       for name in overlaps.index.names]
-    cohort_cols = reduce(lambda x,y: x + y, cohort_col_grps)
-    non_cohort_cols = [col for col in columns if col not in cohort_cols]
-    ordered_cols = cohort_cols + non_cohort_cols
-    printable = flat.loc[:, ordered_cols]
+    ordered_cols = _ordered_columns(tuple(flat.columns),
+                                    tuple(overlaps.index.names))
+    printable = flat.loc[:, list(ordered_cols)]
     if format == 'text':
         return printable.to_string(index=False)
     elif format == 'html':
@@ -140,18 +145,107 @@ def print_overlap(overlaps, qualifier=None, format='html'):
     else:
         raise ValueError("Unrecognized overlap print format: %s" % format)
 
-def _overlap_pvalue(N, overlap, gs1, gs2):
+
+@lru_cache(maxsize=16)
+def _ordered_columns(columns, index_names):
+    """
+    Orders the printable overlap columns with the cohort columns
+    first. The *Genes* columns are omitted.
+
+    :param columns: the flattened overlap column name tuple
+    :param index_names: the overlap index level name tuple
+    :return: the ordered column name tuple
+    """
+    # Classify each column in one pass.
+    cohort_col_grps = {name: [] for name in index_names}
+    non_cohort_cols = []
+    for col in columns:
+        if col.endswith("Genes"):
+            continue
+        name = next((name for name in index_names if col.startswith(name)),
+                    None)
+        if name is None:
+            non_cohort_cols.append(col)
+        else:
+            cohort_col_grps[name].append(col)
+    cohort_cols = chain.from_iterable(cohort_col_grps.values())
+    return tuple(cohort_cols) + tuple(non_cohort_cols)
+
+
+def _overlap_pvalues(N, overlap_sizes, sizes1, sizes2):
     """
     :param N: the number of background genes
-    :param overlap: the genes in common
-    :param gs1: the first gene set
-    :param gs2: the second gene set
-    :return: the probability of gene set overlap from
+    :param overlap_sizes: the numbers of genes in common
+    :param sizes1: the first gene set sizes
+    :param sizes2: the second gene set sizes
+    :return: the probabilities of gene set overlap from
       a background population of *N* genes
     """
-    # The hypergeometric distribution parameters.
-    k = len(overlap) - 1
-    n1 = len(gs1)
-    n2 = len(gs2)
-    # Return the overlap probability.
-    return hypergeom.sf(k, N, n1, n2)
+    # The hypergeometric distribution (k, n1, n2) parameters.
+    params = np.stack([overlap_sizes - 1, sizes1, sizes2])
+    # Gene set sizes recur, so evaluate each distinct parameter
+    # triple only once.
+    distinct, inverse = np.unique(params, axis=1, return_inverse=True)
+    pvalues = hypergeom.sf(distinct[0], N, distinct[1], distinct[2])
+    # Return the overlap probabilities.
+    return pvalues[inverse.ravel()]
+
+
+def _bh_fdr(pvalues):
+    """
+    Applies the Benjamini–Hochberg FDR procedure to the given
+    p-values.
+
+    :param pvalues: the p-value array
+    :return: the FDR array, in the same order as the p-values
+    """
+    size = pvalues.size
+    order = np.argsort(pvalues)
+    # Scale each sorted p-value by the test count over its rank.
+    scaled = pvalues[order] * size / np.arange(1, size + 1)
+    # The FDR is the least scaled p-value at or above the rank.
+    adjusted = np.minimum.accumulate(scaled[::-1])[::-1]
+    fdrs = np.empty(size)
+    fdrs[order] = np.minimum(adjusted, 1)
+    return fdrs
+
+
+def _encode(clusters):
+    """
+    Encodes each cluster as a sparse module x gene membership
+    matrix. The matrix columns are the union of the cluster genes.
+
+    Each module is stored as its sorted int32 gene ids, i.e. the
+    matrix row column indices, rather than as a set of gene names.
+    The gene ids follow the sorted gene names.
+
+    :param clusters: the cluster series collection
+    :return: the (genes, membership CSR matrices) tuple, where
+        *genes* is the gene array in matrix column order
+    """
+    genes = pd.Index(list(chain.from_iterable(
+        chain.from_iterable(cluster.values for cluster in clusters)
+    ))).unique().sort_values()
+    memberships = [_encode_cluster(cluster, genes) for cluster in clusters]
+    return np.asarray(genes, dtype=object), memberships
+
+
+def _encode_cluster(cluster, genes):
+    """
+    :param cluster: the cluster series to encode
+    :param genes: the gene index
+    :return: the cluster module x gene membership CSR matrix
+    """
+    sizes = np.fromiter(map(len, cluster.values), dtype=np.int64,
+                        count=cluster.size)
+    indptr = np.concatenate([[0], np.cumsum(sizes)])
+    flat = list(chain.from_iterable(cluster.values))
+    indices = genes.get_indexer(flat).astype(np.int32)
+    data = np.ones(indices.size, dtype=np.int32)
+    shape = (cluster.size, genes.size)
+    matrix = csr_matrix((data, indices, indptr), shape=shape)
+    # Sort each module's gene ids. A gene listed more than once
+    # in a module counts once.
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix
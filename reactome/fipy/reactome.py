@@ -1,23 +1,84 @@
-import requests
-from . import rest
+import pandas as pd
+from . import (cytoscape, rest)
+
+_indexed = (None, None)
+"""
+The most recently indexed (hierarchy, pathway data frame) tuple.
+The index is reused for the same hierarchy object, so hierarchies
+are treated as immutable.
+"""
+
 
 def load_pathway_hierarchy():
-    resp = requests.get(rest.get_fi_url('pathwayTree'))
+    global _indexed
+    # Loading the hierarchy resets the session enrichment state
+    # and releases the previously indexed hierarchy.
+    cytoscape.reset()
+    _indexed = (None, None)
+    resp = rest.SESSION.get(rest.get_fi_url('pathwayTree'))
     return resp.json()['data']
 
 def get_hierarchy_node(pathway, hierarchy):
     """
     Returns the Reactome hierarchy node for the given pathway.
+    The hierarchy is indexed by pathway name on first use, so
+    repeated lookups in the same hierarchy do not search the tree.
+
+    *Note*: The hierarchy must not be modified in place, since
+    the lookup would then return stale nodes. Modify a copy instead.
 
     :param pathway: the pathway to check
     :param hierarchy: the Reactome pathway hierarchy to check
     :return: the hierarchy node
     """
-    if hierarchy['name'] == pathway:
-        return hierarchy
-    children = hierarchy.get('children')
-    if children:
-        for subtree in children:
-            target = get_hierarchy_node(pathway, subtree)
-            if target:
-                return target
+    return index_hierarchy(hierarchy).node.get(pathway)
+
+
+def index_hierarchy(hierarchy):
+    """
+    Flattens the Reactome hierarchy into a data frame with index
+    *Pathway* and columns *dbId*, *hasDiagram* and *node*. The
+    columns hold the pathway database ids, diagram flags and
+    hierarchy nodes, resp. The frame of the most recently indexed
+    hierarchy is reused, subject to the :meth:`get_hierarchy_node`
+    note.
+
+    :param hierarchy: the Reactome pathway hierarchy to index
+    :return: the pathway data frame
+    """
+    global _indexed
+    indexed, nodes = _indexed
+    if indexed is not hierarchy:
+        nodes = _index_hierarchy(hierarchy)
+        _indexed = (hierarchy, nodes)
+    return nodes
+
+
+def _index_hierarchy(hierarchy):
+    """
+    Flattens the hierarchy as described in :meth:`index_hierarchy`.
+    The hierarchy is walked depth-first without recursion. If a
+    pathway occurs more than once, then the first node visited is
+    retained.
+
+    :param hierarchy: the Reactome pathway hierarchy to index
+    :return: the pathway data frame
+    """
+    nodes = []
+    stack = [hierarchy]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        children = node.get('children')
+        if children:
+            # Visit the children in order.
+            stack.extend(reversed(children))
+    index = pd.Index([node['name'] for node in nodes], name='Pathway')
+    data = {
+        'dbId': [node.get('dbId') for node in nodes],
+        'hasDiagram': [bool(node.get('hasDiagram')) for node in nodes],
+        'node': nodes
+    }
+    flattened = pd.DataFrame(data, index=index,
+                             columns=['dbId', 'hasDiagram', 'node'])
+    return flattened[~index.duplicated()]
@@ -1,7 +1,30 @@
 import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from .constants import SERVICE_URL
 
 
+def _create_session():
+    """
+    :return: a session which pools and retries connections
+    """
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.2)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32,
+                          max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+SESSION = _create_session()
+"""
+The shared REST session. The session keeps the connections
+alive across requests.
+"""
+
+
 def get_url(*params, **kwargs):
     """
     :param params: the URL path component strings
@@ -48,14 +71,17 @@ def parse_fi_table_response(resp, parsers, index=None):
     # The response JSON data object.
     data = resp.json()['data']
     # The data columns.
-    columns = data.get('tableHeaders') if data else parsers.keys()
-    # The default "parser".
-    identity = lambda value: value
-    parsers_list = [parsers.get(col, identity) for col in columns]
-    # Parses a content row.
-    parse_row = lambda row: tuple(parsers_list[i](value)
-                                  for i, value in enumerate(row))
-    # The parsed content list.
-    content = map(parse_row, data['tableContent']) if data else []
+    columns = data.get('tableHeaders') if data else list(parsers.keys())
+    # The raw content rows.
+    content = data['tableContent'] if data else []
+    parsed = pd.DataFrame(content, columns=columns)
+    # Parse the content a column at a time. Columns without a
+    # parser are left as is.
+    for column in columns:
+        parser = parsers.get(column)
+        if parser in (int, float):
+            parsed[column] = parsed[column].astype(parser)
+        elif parser:
+            parsed[column] = parsed[column].map(parser)
     # Return the data frames.
-    return pd.DataFrame.from_records(content, index=index, columns=columns)
+    return parsed.set_index(index) if index else parsed
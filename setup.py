@@ -1,5 +1,4 @@
 import os
-import re
 from setuptools import (setup, find_packages)
 
 
@@ -13,21 +12,13 @@ def version(package):
     :return: the package version as listed in the package `__init.py__`
         `__version__` variable.
     """
-    # The version string parser.
-    REGEXP = re.compile("""
-       __version__   # The version variable
-       \s*=\s*       # Assignment
-       ['\"]         # Leading quote
-       (.+)          # The version string capture group
-       ['\"]         # Trailing quote
-    """, re.VERBOSE)
-
     with open(os.path.join(package, '__init__.py')) as f:
-       match = REGEXP.search(f.read())
-       if not match:
-           raise InstallError("The reactome fipy __version__ variable"
-                              " was not found")
-       return match.group(1)
+        # Scan for the __version__ assignment line.
+        for line in f:
+            if line.startswith('__version__'):
+                return line.split('=', 1)[1].strip().strip('\'"')
+    raise InstallError("The reactome fipy __version__ variable"
+                       " was not found")
 
 
 def requires():
@@ -63,5 +54,9 @@ setup(
         'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
     ],
-    install_requires = requires()
+    install_requires = requires(),
+    extras_require = {
+        # pyarrow speeds up reading the MAF files.
+        'pyarrow': ['pyarrow']
+    }
 )
@@ -1,8 +1,10 @@
 import os
+from contextlib import contextmanager
+from unittest.mock import patch
 import pandas as pd
-from nose.tools import assert_equal
+from nose.tools import (assert_equal, assert_true)
 from .. import ROOT
-from reactome.fipy import (reactome, enrichment)
+from reactome.fipy import (reactome, enrichment, cytoscape, rest)
 
 # The test fixtures directory.
 FIXTURES = os.path.join(ROOT, 'fixtures')
@@ -30,6 +32,73 @@ class TestEnrichment(object):
                      (enriched.values, enriched.index.size))
 
 
+class TestEnrichmentCache(object):
+    """Enrichment cache tests against a stub server."""
+
+    def test_cache_hit(self):
+        with _stub_server() as request:
+            enrichment._enrich_genes(['A', 'B'])
+            enrichment._enrich_genes(['B', 'A', 'B'])
+            assert_equal(1, request.call_count,
+                         "Enrichment request count incorrect: %d" %
+                         request.call_count)
+
+    def test_copy(self):
+        with _stub_server():
+            enriched = enrichment._enrich_genes(['A', 'B'])
+            enriched['FDR'] = 1.0
+            enriched = enrichment._enrich_genes(['A', 'B'])
+            fdrs = list(enriched['FDR'])
+            assert_equal([0.02], fdrs, "Cached FDRs modified: %s" % fdrs)
+
+    def test_export_diagram(self):
+        with _stub_server() as request:
+            # The first export enriches the genes for highlighting.
+            enrichment.export_diagram('P', 1, ['A', 'B'], out_dir='/tmp')
+            assert_equal(1, request.call_count,
+                         "Enrichment request count incorrect: %d" %
+                         request.call_count)
+            # The session already highlights the genes.
+            enrichment.export_diagram('Q', 2, ['B', 'A'], out_dir='/tmp')
+            assert_equal(1, request.call_count,
+                         "Highlighted genes were re-enriched")
+            # Clearing the session discards the highlighted genes and
+            # the cache.
+            cytoscape.clear()
+            assert_true(not enrichment._ENRICHMENT_CACHE,
+                        "Enrichment cache not cleared")
+            enrichment.export_diagram('P', 1, ['A', 'B'], out_dir='/tmp')
+            assert_equal(2, request.call_count,
+                         "Genes were not re-enriched after clear")
+
+
+@contextmanager
+def _stub_server():
+    """
+    Stubs the REST session and the enrichment request.
+
+    :yield: the enrichment request mock
+    """
+    cytoscape.reset()
+    try:
+        with patch.object(rest, 'SESSION'):
+            with patch.object(enrichment, '_request_enrichment',
+                              side_effect=_stub_enrichment) as request:
+                yield request
+    finally:
+        cytoscape.reset()
+
+
+def _stub_enrichment(genes):
+    """
+    :param genes: the genes to enrich
+    :return: a stub enrichment data frame
+    """
+    index = pd.Index(['P'], name='Pathway')
+    return pd.DataFrame({'p-value': [0.01], 'FDR': [0.02]}, index=index,
+                        columns=['p-value', 'FDR'])
+
+
 if __name__ == "__main__":
     import nose
     nose.main(defaultTest=__name__)
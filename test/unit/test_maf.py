@@ -1,8 +1,10 @@
 import os
 import shutil
-from nose.tools import (assert_true, assert_equal)
+from unittest.mock import patch
+import requests
+from nose.tools import (assert_true, assert_equal, assert_raises)
 from .. import ROOT
-from reactome.fipy import maf
+from reactome.fipy import (maf, rest)
 import csv
 
 # The test results directory.
@@ -33,6 +35,69 @@ class TestMaf(object):
                             barcode.startswith('TCGA'))
 
 
+class TestMafPaging(object):
+    """MAF download paging tests against a stub server."""
+
+    def test_failure_past_eof(self):
+        # The MAF has 11 pages. The pages from 15 on fail, but they
+        # are only requested speculatively past the empty page 12.
+        out_file = _out_file()
+        with patch.object(rest.SESSION, 'get', _stub_get(11, 15)):
+            maf.download('X', out_file)
+        with open(out_file) as f:
+            rows = f.read().split()
+        expected = ["row%d" % page for page in range(1, 12)]
+        assert_equal(expected, rows, "MAF content incorrect: %s" % rows)
+
+    def test_failure_before_eof(self):
+        out_file = _out_file()
+        with patch.object(rest.SESSION, 'get', _stub_get(11, 5)):
+            with assert_raises(requests.exceptions.HTTPError):
+                maf.download('X', out_file)
+
+
+def _out_file():
+    """
+    :return: the stub MAF output file path
+    """
+    os.makedirs(RESULTS, exist_ok=True)
+    return os.path.join(RESULTS, 'X.maf')
+
+
+class _StubResponse(object):
+    """A stub MAF page response."""
+
+    def __init__(self, page, page_cnt, failed_page):
+        self.page = page
+        self.page_cnt = page_cnt
+        self.failed_page = failed_page
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def raise_for_status(self):
+        if self.page >= self.failed_page:
+            raise requests.exceptions.HTTPError("Page %d failed" % self.page)
+
+    def iter_content(self, chunk_size):
+        if self.page <= self.page_cnt:
+            yield ("row%d\n" % self.page).encode()
+
+
+def _stub_get(page_cnt, failed_page):
+    """
+    :param page_cnt: the number of non-empty pages
+    :param failed_page: the first page which fails
+    :return: the stub session get function
+    """
+    def get(url, params, stream):
+        return _StubResponse(params['page'], page_cnt, failed_page)
+    return get
+
+
 if __name__ == "__main__":
     import nose
     nose.main(defaultTest=__name__)
@@ -1,5 +1,8 @@
 import os
 import numpy as np
+import pandas as pd
+from scipy.stats import hypergeom
+from numpy.testing import assert_allclose
 from nose.tools import assert_equal
 from .. import ROOT
 from reactome.fipy import (network, overlap)
@@ -24,6 +27,100 @@ class TestOverlap(object):
                      "Shared size incorrect: %d" % filtered.index.size)
 
 
+class TestAnalyse(object):
+    """Overlap analysis tests on hand-built clusters."""
+
+    def test_analyse(self):
+        clusters = _clusters()
+        overlaps = overlap.analyse(clusters, n=100)
+        assert_equal([(1, 2), (1, 3), (2, 1)], list(overlaps.index),
+                     "Overlap index incorrect: %s" % list(overlaps.index))
+        assert_equal(['A', 'B'], list(overlaps.index.names),
+                     "Overlap index names incorrect: %s" %
+                     list(overlaps.index.names))
+        for mod1, mod2 in overlaps.index:
+            genes1 = set(clusters[0][mod1])
+            genes2 = set(clusters[1][mod2])
+            expected = genes1 & genes2
+            shared = overlaps.loc[(mod1, mod2), 'Shared']
+            assert_equal(expected, shared,
+                         "Shared genes incorrect for %s: %s" %
+                         ((mod1, mod2), shared))
+            pvalue = hypergeom.sf(len(expected) - 1, 100, len(genes1),
+                                  len(genes2))
+            assert_allclose(overlaps.loc[(mod1, mod2), 'p-value'], pvalue,
+                            err_msg="p-value incorrect for %s" %
+                            ((mod1, mod2),))
+
+    def test_no_overlap(self):
+        clusters = [_cluster('A', {1: ['g1']}), _cluster('B', {1: ['g2']})]
+        overlaps = overlap.analyse(clusters, n=100)
+        assert_equal(0, overlaps.index.size,
+                     "Overlap size incorrect: %d" % overlaps.index.size)
+        assert_equal(['Shared', 'p-value', 'FDR'], list(overlaps.columns),
+                     "Overlap columns incorrect: %s" % list(overlaps.columns))
+
+    def test_empty_cluster(self):
+        clusters = [_cluster('A', {}), _clusters()[1]]
+        overlaps = overlap.analyse(clusters, n=100)
+        assert_equal(0, overlaps.index.size,
+                     "Overlap size incorrect: %d" % overlaps.index.size)
+
+
+class TestFDR(object):
+    """Benjamini-Hochberg FDR tests."""
+
+    # The reference values are the statsmodels multipletests
+    # fdr_bh corrected p-values.
+
+    def test_unordered(self):
+        pvalues = np.array([0.01, 0.04, 0.03, 0.005, 0.2])
+        expected = [0.025, 0.05, 0.05, 0.025, 0.2]
+        assert_allclose(overlap._bh_fdr(pvalues), expected,
+                        err_msg="Unordered FDRs incorrect")
+
+    def test_ties(self):
+        pvalues = np.array([0.02, 0.02, 0.04, 0.01, 0.5])
+        expected = [0.1 / 3, 0.1 / 3, 0.05, 0.1 / 3, 0.5]
+        assert_allclose(overlap._bh_fdr(pvalues), expected,
+                        err_msg="Tied FDRs incorrect")
+
+    def test_monotone(self):
+        pvalues = np.array([0.6, 0.9, 0.8])
+        expected = [0.9, 0.9, 0.9]
+        assert_allclose(overlap._bh_fdr(pvalues), expected,
+                        err_msg="Monotone FDRs incorrect")
+
+    def test_single(self):
+        fdrs = overlap._bh_fdr(np.array([0.3]))
+        assert_allclose(fdrs, [0.3], err_msg="Single FDR incorrect")
+
+    def test_empty(self):
+        fdrs = overlap._bh_fdr(np.array([]))
+        assert_equal(0, fdrs.size, "Empty FDR size incorrect: %d" % fdrs.size)
+
+
+def _clusters():
+    """
+    :return: the hand-built A and B cluster series
+    """
+    return [
+        _cluster('A', {1: ['g1', 'g2', 'g3'], 2: ['g4', 'g5']}),
+        _cluster('B', {1: ['g5', 'g6'], 2: ['g1', 'g3', 'g7'], 3: ['g2']})
+    ]
+
+
+def _cluster(name, modules):
+    """
+    :param name: the cluster name
+    :param modules: the {module: genes} dictionary
+    :return: the {module: genes} cluster series
+    """
+    index = pd.Index(list(modules.keys()), name='Module')
+    return pd.Series(list(modules.values()), index=index, name=name,
+                     dtype=object)
+
+
 if __name__ == "__main__":
     import nose
     nose.main(defaultTest=__name__)
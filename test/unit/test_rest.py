@@ -4,6 +4,14 @@ from nose.tools import assert_equal
 from .. import ROOT
 from reactome.fipy import rest
 
+# The test column parsers.
+PARSERS = {
+    'Pathway': lambda p: p,
+    'Count': int,
+    'P-value': float,
+    'Genes': lambda s: s.split(',')
+}
+
 
 class TestRest(object):
     """REST tests."""
@@ -21,6 +29,66 @@ class TestRest(object):
                      "Incorrect URL: %s" % actual)
 
 
+class TestParseFITableResponse(object):
+    """Reactome FI table response parsing tests."""
+
+    def test_parse(self):
+        data = {
+            'tableHeaders': ['Pathway', 'Count', 'P-value', 'Genes', 'Note'],
+            'tableContent': [['P1', '12', '0.01', 'A,B', 'x'],
+                             ['P2', '3', '1e-5', 'C', 'y']]
+        }
+        parsed = rest.parse_fi_table_response(_StubResponse(data), PARSERS,
+                                              index='Pathway')
+        assert_equal('Pathway', parsed.index.name,
+                     "Index name incorrect: %s" % parsed.index.name)
+        assert_equal(['P1', 'P2'], list(parsed.index),
+                     "Index incorrect: %s" % list(parsed.index))
+        assert_equal(['Count', 'P-value', 'Genes', 'Note'],
+                     list(parsed.columns),
+                     "Columns incorrect: %s" % list(parsed.columns))
+        # The int and float columns are cast.
+        assert_equal('i', parsed['Count'].dtype.kind,
+                     "Count dtype incorrect: %s" % parsed['Count'].dtype)
+        assert_equal([12, 3], list(parsed['Count']),
+                     "Count values incorrect: %s" % list(parsed['Count']))
+        assert_equal('f', parsed['P-value'].dtype.kind,
+                     "P-value dtype incorrect: %s" % parsed['P-value'].dtype)
+        assert_equal([0.01, 1e-5], list(parsed['P-value']),
+                     "P-value values incorrect: %s" %
+                     list(parsed['P-value']))
+        # The other parsers are mapped over the column.
+        assert_equal([['A', 'B'], ['C']], list(parsed['Genes']),
+                     "Genes values incorrect: %s" % list(parsed['Genes']))
+        # A column without a parser is left as is.
+        assert_equal(['x', 'y'], list(parsed['Note']),
+                     "Note values incorrect: %s" % list(parsed['Note']))
+
+    def test_empty(self):
+        parsed = rest.parse_fi_table_response(_StubResponse(None), PARSERS,
+                                              index='Pathway')
+        assert_equal(0, parsed.index.size,
+                     "Parsed size incorrect: %d" % parsed.index.size)
+        assert_equal('Pathway', parsed.index.name,
+                     "Index name incorrect: %s" % parsed.index.name)
+        assert_equal(['Count', 'P-value', 'Genes'], list(parsed.columns),
+                     "Columns incorrect: %s" % list(parsed.columns))
+        assert_equal('i', parsed['Count'].dtype.kind,
+                     "Count dtype incorrect: %s" % parsed['Count'].dtype)
+        assert_equal('f', parsed['P-value'].dtype.kind,
+                     "P-value dtype incorrect: %s" % parsed['P-value'].dtype)
+
+
+class _StubResponse(object):
+    """A stub CyREST response."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return dict(data=self.data)
+
+
 if __name__ == "__main__":
     import nose
     nose.main(defaultTest=__name__)